@@ -3,24 +3,161 @@
 command-line replacement for Ruby ascii85 program
 '''
 import sys
+import io
 import base64
 import logging
 
 logging.basicConfig(level=logging.DEBUG if __debug__ else logging.WARN)
 
 OUTPUT = sys.stdout.buffer
+CHUNKSIZE = 65536  # a multiple of 4, so only the final chunk needs padding
+WHITESPACE = b' \t\n\r\v'
+DIGITS = bytes(range(ord('!'), ord('u') + 1))
+VALUES = bytes((n - ord('!')) % 256 for n in range(256))  # digit values
+POWERS = tuple(85 ** n for n in range(4, -1, -1))
 
-def a85encode(infile):
+def a85encode(infile, chunksize=CHUNKSIZE):
+    r'''
+    use base64 library to encode ascii85, a chunk at a time
+
+    each group of 4 input bytes becomes 5 output characters independently
+    of the others, so as long as every chunk but the last is a multiple of
+    4 bytes long, the encoded chunks can simply be concatenated.
+
+    >>> from io import BytesIO
+    >>> b''.join(a85encode(BytesIO(b'\0\0\0\0abcdefg'), 4))
+    b'<~z@:E_WAS,Q~>'
     '''
-    use base64 library to encode ascii85
+    yield b'<~'
+    pending = b''
+    while chunk := infile.read(chunksize):
+        pending += chunk
+        cut = len(pending) - len(pending) % 4
+        yield base64.a85encode(pending[:cut])
+        pending = pending[cut:]
+    yield base64.a85encode(pending) + b'~>'
+
+def decodegroups(data):
+    r'''
+    decode whitespace-free ascii85 data, without the `<~` and `~>`
+
+    base64.a85decode goes through its input a character at a time. here,
+    each of the 5 digit positions is instead sliced out for all the groups
+    at once, dropped into the low byte of an 8-byte slot per group, and
+    read as one big integer; scaling those by 85**4 ... 85**0 and summing
+    builds every group's value in its own slot with no carries between
+    them, so the 4 low bytes of each slot are the decoded output.
+
+    >>> decodegroups(b'z@:E_WAS,Q')
+    b'\x00\x00\x00\x00abcdefg'
+    >>> decodegroups(b's8W-!')
+    b'\xff\xff\xff\xff'
+    >>> decodegroups(b's8W-"')
+    Traceback (most recent call last):
+      ...
+    ValueError: Ascii85 overflow
+    >>> decodegroups(b'@:z')
+    Traceback (most recent call last):
+      ...
+    ValueError: z inside Ascii85 5-tuple
     '''
-    return base64.a85encode(infile.read(), adobe=True)
+    pieces = data.split(b'z')
+    if any(len(piece) % 5 for piece in pieces[:-1]):
+        raise ValueError('z inside Ascii85 5-tuple')
+    data = b'!!!!!'.join(pieces)
+    if data.translate(None, DIGITS):
+        raise ValueError(f'Non-Ascii85 digit found in {data[:16]!r}')
+    padding = -len(data) % 5  # pad with `u`, and drop as many bytes after
+    data = (data + b'u' * padding).translate(VALUES)
+    count = len(data) // 5
+    slots, total = bytearray(count * 8), 0
+    for place, power in enumerate(POWERS):
+        slots[7::8] = data[place::5]
+        total += power * int.from_bytes(slots, 'big')
+    slots = total.to_bytes(count * 8, 'big')
+    if slots[3::8].count(0) != count:  # a group came to 2**32 or more
+        raise ValueError('Ascii85 overflow')
+    decoded = bytearray(count * 4)
+    for place in range(4):
+        decoded[place::4] = slots[place + 4::8]
+    return bytes(decoded[:len(decoded) - padding])
+
+def a85decode(infile, chunksize=CHUNKSIZE):
+    r'''
+    decode ascii85 a chunk at a time, using decodegroups()
+
+    whitespace is dropped as it is read, and any incomplete 5-character
+    group at the end of a chunk is held over for the next one.
 
-def a85decode(infile):
+    >>> from io import BytesIO
+    >>> encoded = BytesIO(b'<~z@:E_W\nAS,Q~>\n')
+    >>> b''.join(a85decode(encoded, 3))
+    b'\x00\x00\x00\x00abcdefg'
+    >>> b''.join(a85decode(BytesIO(b'<~!!z!!!~>'), 3))
+    Traceback (most recent call last):
+      ...
+    ValueError: z inside Ascii85 5-tuple
     '''
-    use base64 library to decode ascii85
+    pending = b''
+    started = False
+    while chunk := infile.read(chunksize):
+        pending += chunk.translate(None, WHITESPACE)
+        if not started:
+            if len(pending) < 2:
+                continue
+            if pending.startswith(b'<~'):
+                pending = pending[2:]
+            started = True
+        if (end := pending.find(b'~>')) >= 0:
+            pending = pending[:end]
+            break
+        cut = len(pending) - pending.endswith(b'~')  # hold possible `~>`
+        # groups are counted from the last `z`, so a misplaced one is left
+        # inside the piece for decodegroups() to catch
+        cut -= (cut - pending.rfind(b'z', 0, cut) - 1) % 5
+        yield decodegroups(pending[:cut])
+        pending = pending[cut:]
+    yield decodegroups(pending.removeprefix(b'<~'))
+
+class A85Reader(io.RawIOBase):
+    r'''
+    readable stream of the decoded bytes from an ascii85 file
+
+    lets a consumer such as lzw.decode() pull decoded data straight from
+    the a85decode() generator, a chunk at a time, rather than needing the
+    whole decoded file in memory first.
+
+    >>> import lzw
+    >>> from io import BytesIO
+    >>> packed, unpacked = BytesIO(), BytesIO()
+    >>> lzw.encode(BytesIO(b'TOBEORNOT' * 100), packed)
+    >>> encoded = BytesIO(b''.join(a85encode(BytesIO(packed.getvalue()))))
+    >>> lzw.decode(A85Reader(encoded, 8), unpacked)
+    >>> unpacked.getvalue() == b'TOBEORNOT' * 100
+    True
     '''
-    return base64.a85decode(adobe(infile.read()), adobe=True)
+    def __init__(self, infile, chunksize=CHUNKSIZE):
+        super().__init__()
+        self.chunks = a85decode(infile, chunksize)
+        self.pending = memoryview(b'')
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        '''
+        fill buffer from the current decoded chunk, fetching another when
+        that runs out; returns 0 only at the end of the data
+        '''
+        while not self.pending:
+            try:
+                self.pending = memoryview(next(self.chunks))
+            except StopIteration:
+                return 0
+        count = min(len(buffer), len(self.pending))
+        buffer[:count] = self.pending[:count]
+        self.pending = self.pending[count:]
+        return count
 
 def adobe(bytestring):
     r'''
@@ -37,11 +174,10 @@ def adobe(bytestring):
     >>> adobe(b'<~JcC<$~>')
     b'<~JcC<$~>'
     '''
-    bytestring = b'<~' + (bytestring.strip()
-                          .lstrip(b'<~')
-                          .rstrip(b'~>')
-                         ) + b'~>'
-    return bytestring
+    bytestring = bytestring.strip()
+    start = 2 if bytestring.startswith(b'<~') else 0
+    end = -2 if bytestring.endswith(b'~>') else len(bytestring)
+    return b'<~' + bytestring[start:end] + b'~>'
 
 SELECTOR = {
  '-d': a85decode,
@@ -65,4 +201,5 @@ def route(args):
     return command(infile)
 
 if __name__ == '__main__':
-    OUTPUT.write(route(sys.argv[1:]))
+    for output in route(sys.argv[1:]):
+        OUTPUT.write(output)
@@ -14,17 +14,27 @@ a ClearCode, and the encoder will send it at the end of each strip. This
 results in much larger LZW-compressed images, over 10 times larger in
 the card.lzw test case.
 
+In that strip mode, every strip stands on its own, so if ENCODE_WORKERS
+is set to a number greater than 1, the encoder will pack that many strips
+at a time in separate processes.
+
 On page 61: "Every LZW-compressed strip must begin on a byte boundary."
 So, the bitstream should be cleared after sending, and after receiving,
 EndOfInformation.
 '''
-import sys, os, struct, logging  # pylint: disable=multiple-imports
+import sys, os, io, logging  # pylint: disable=multiple-imports
+from itertools import islice, repeat
 
 CLEAR_CODE = 256
 END_OF_INFO_CODE = 257
 MINBITS, MAXBITS = 9, 12
 EOI_IS_EOD = os.getenv('EOI_IS_EOD', '1')
+ENCODE_WORKERS = os.getenv('ENCODE_WORKERS', '')  # parsed by encode()
 CODE_SIZE = 256  # original dict size, used for deciding when to increase bits
+BUFFER_SIZE = 8192  # see "8K" on p. 56 of TIFF6.pdf
+# starting tables for newdict(), which returns shallow copies of these
+CODEDICT = {k: bytes([k]) for k in range(256)}
+SPECIAL_CODEDICT = {**CODEDICT, CLEAR_CODE: None, END_OF_INFO_CODE: None}
 
 logging.basicConfig(level=logging.DEBUG if __debug__ else logging.WARNING)
 # pylint: disable=consider-using-f-string  # leave this for later
@@ -42,13 +52,11 @@ def newdict(specialcodes=True):
     `specialcodes` means that the CLEAR_CODE (256) and END_OF_INFO_CODE (257)
     from https://github.com/joeatwork/python-lzw are in use, which is the
     case in the data extracted from my Red Cross certification card PDF.
+
+    the tables are built once at import time, so getting a fresh one is a
+    shallow copy rather than building 256 new single-byte strings.
     '''
-    codedict = {k: bytes([k]) for k in range(256)}
-    if specialcodes:
-        codedict[CLEAR_CODE] = None
-        codedict[END_OF_INFO_CODE] = None
-    #doctest_debug('codedict: %s', codedict)
-    return codedict
+    return (SPECIAL_CODEDICT if specialcodes else CODEDICT).copy()
 
 def decode(instream=None, outstream=None, # pylint: disable=too-many-arguments
            specialcodes=True, minbits=9, maxbits=12, codegenerator=None):
@@ -140,6 +148,27 @@ def decode(instream=None, outstream=None, # pylint: disable=too-many-arguments
     >>> decode(None, outstream, False, 9, 9, iter(codes))
     >>> outstream.getvalue()
     b'To be or not to be that is the question!'
+
+    Without the special codes, 257 is just another table entry, even when
+    the bits following it aren't zero (as they would have to be after
+    EndOfInformation); here the same codes are packed into a byte stream:
+    >>> packed = 0
+    >>> for code in codes:
+    ...     packed = (packed << 9) | code
+    >>> size = (len(codes) * 9 + 7) // 8
+    >>> packed <<= size * 8 - len(codes) * 9
+    >>> outstream = BytesIO()
+    >>> decode(BytesIO(packed.to_bytes(size, 'big')), outstream, False, 9, 9)
+    >>> outstream.getvalue()
+    b'To be or not to be that is the question!'
+
+    The encoder doesn't have to send ClearCode as soon as the table is full;
+    decoding just carries on with the table as it is:
+    >>> outstream = BytesIO()
+    >>> codes = [65] + list(range(256, 512)) + [511]  # 511 is the last slot
+    >>> decode(None, outstream, False, 9, 9, iter(codes))
+    >>> outstream.getvalue() == b'A' * (1 + sum(range(2, 258)) + 257)
+    True
     >>> outstream = BytesIO()
     >>> codes = [34,84,104,101,114,101,32,105,115,32,110,111,116,104,
     ...     105,110,103,32,112,259,109,97,110,101,110,116,32,101,120,
@@ -158,25 +187,36 @@ def decode(instream=None, outstream=None, # pylint: disable=too-many-arguments
         '''
         get next code from lzw-compressed data
 
+        input is read a buffer at a time, and shifted into the integer
+        `bitstream` 8 bits at a time; codes are taken off the high end.
+
         requires Python 3.8 or better for 'walrus' (:=) operator
+
+        the EndOfInformation byte-boundary check only applies when the
+        special codes are in use; otherwise 257 is just another table entry.
+        that's settled once here, rather than on every code.
         '''
-        nonlocal bitstream
-        doctest_debug('nextcode(): bitstream=%r', bitstream)
-        while not end_of_data and (byte := instream.read(1)):
-            rawbyte = ord(byte)
-            doctest_debug("input byte b'\\x%02x'", rawbyte)
-            bitstream += format(rawbyte, '08b')
-            if len(bitstream) >= bitlength:
-                bincode = bitstream[:bitlength]
-                bitstream = bitstream[bitlength:]
-                code = int(bincode, 2)
-                doctest_debug('nextcode: 0x%x (%d) %s', code, code, bincode)
-                if code == END_OF_INFO_CODE:
-                    if bitstream.strip('0'):
-                        doctest_debug('bitstream: %s', bitstream)
-                        raise ValueError('nonzero bits remaining after EOI')
-                    bitstream = ''
-                yield code
+        eoi = END_OF_INFO_CODE if specialcodes else None
+        read = instream.read
+        bitstream = bits = 0  # integer bit buffer, and count of bits in it
+        while not end_of_data and (chunk := read(BUFFER_SIZE)):
+            for rawbyte in chunk:
+                bitstream = (bitstream << 8) | rawbyte
+                bits += 8
+                while bits >= bitlength:
+                    bits -= bitlength
+                    code = bitstream >> bits
+                    bitstream &= (1 << bits) - 1
+                    if code == eoi:
+                        if bitstream:
+                            doctest_debug('bitstream: 0x%x (%d bits)',
+                                          bitstream, bits)
+                            raise ValueError(
+                                'nonzero bits remaining after EOI')
+                        bitstream = bits = 0
+                    yield code
+                    if end_of_data:
+                        return
     def insert(bytestring):
         '''
         AddStringToTable() from pseudocode.
@@ -197,99 +237,120 @@ def decode(instream=None, outstream=None, # pylint: disable=too-many-arguments
         shouldn't be more than 1 plus the highest known code, or it is
         an error in the codestream. We will trap this below.
         '''
-        nonlocal bitlength
-        newkey = len(codedict)
-        codedict[newkey] = bytestring
-        doctest_debug('added 0x%x (%d), key %d bytes ...%s to dict',
-                      newkey, newkey, len(bytestring), bytestring[-16:])
-        if (newkey + 2).bit_length() == (newkey + 1).bit_length() + 1:
+        nonlocal bitlength, growat, tabsize
+        newkey = tabsize
+        if newkey == len(table):
+            # the table already holds every code `maxbits` can express, and
+            # the encoder hasn't sent ClearCode yet, which it needn't do.
+            # anything added now could never be looked up, so leave it out.
+            return
+        table[newkey] = bytestring
+        tabsize += 1
+        if newkey == growat:  # 510, 1022, 2046 (and 4094) as above
             if bitlength < maxbits:
                 doctest_debug(
                     'increasing bitlength to %d at code %d',
                     bitlength + 1, newkey)
                 bitlength += 1
+                growat = (1 << bitlength) - 2
     instream = instream or sys.stdin.buffer
     outstream = outstream or sys.stdout.buffer
-    bitstream = ''
     codegenerator = codegenerator or nextcode(instream)
-    codedict = newdict(specialcodes)
     minbits = bitlength = (minbits or MINBITS)
     maxbits = maxbits or MAXBITS
+    # the string table is a list indexed by code, preallocated to the most
+    # codes `maxbits` can express. `tabsize` counts the live entries, so a
+    # ClearCode only has to reset it; stale entries past it are unreachable
+    # and get overwritten as the table refills.
+    table = list(newdict(specialcodes).values())
+    firstfree = tabsize = len(table)
+    table += [None] * ((1 << maxbits) - tabsize)
+    growat = (1 << bitlength) - 2  # table size at which bitlength goes up
     lastvalue = codevalue = None
     end_of_data = False
+    # bind attributes and globals used on every code to locals up front,
+    # sparing the interpreter a lookup each time through the loop
+    write, firstchar = outstream.write, CODEDICT
+    # decoded strings are collected here and written out in big blocks,
+    # rather than making a separate write call for each one
+    outbuffer = bytearray()
     # while ((Code = GetNextCode()) != EoiCode) {
     # (we don't actually pay attention to EoiCode unless EOI_IS_EOD is set,
     #  because the TIFF6 spec indicates it should be used at the end of
     #  every 8192-byte strip, which is unnecessary and wasteful, as the
     #  resulting compressed file can be over 10 times larger than it
     #  otherwise has to be. We do, however, have to honor the mandatory
-    #  byte boundary after seeing it, clearing `bitstream`.)
-    for code in codegenerator:
-        #       if (IsInTable(Code)) {
-        #           OutString = StringFromCode(Code);
-        #           try {
-        #               StoreString = StringFromCode(OldCode) +
-        #                   FirstChar(StringFromCode(Code);
-        #           } except(NoOldCodeImmediatelyAfterClearCode) {
-        #               StoreString = null;
-        #           }
-        #       } else {
-        #           OutString = StringFromCode(OldCode) +
-        #               FirstChar(StringFromCode(OldCode);
-        #           StoreString = OutString;
-        #       }
-        #       WriteString(OutString);
-        #       if (StoreString != null) AddStringToTable(StoreString);
-        #       OldCode = Code;
-        if code in codedict:  # if (IsInTable(Code))
-            codevalue = codedict[code]
-            # (remember that CLEAR_CODE and END_OF_INFO_CODE are both
-            #  also in dict and will return None; this will catch that too.)
-            try:
-                storevalue = lastvalue + codevalue[0:1]
-            except TypeError:  # attempting to add bytes to None
-                storevalue = None
-        else:  # code wasn't in dict
-            if code - 1 in codedict:
-                try:
-                    # pylint: disable=unsubscriptable-object  # None or bytes
-                    codevalue = lastvalue + lastvalue[0:1]
-                except (TypeError, IndexError):
-                    codevalue = None
-                storevalue = codevalue
-            else:
-                codevalue = None
-            if codevalue is None:
+    #  byte boundary after seeing it, discarding the remaining bits.)
+    try:
+        for code in codegenerator:
+            #       if (IsInTable(Code)) {
+            #           OutString = StringFromCode(Code);
+            #           try {
+            #               StoreString = StringFromCode(OldCode) +
+            #                   FirstChar(StringFromCode(Code);
+            #           } except(NoOldCodeImmediatelyAfterClearCode) {
+            #               StoreString = null;
+            #           }
+            #       } else {
+            #           OutString = StringFromCode(OldCode) +
+            #               FirstChar(StringFromCode(OldCode);
+            #           StoreString = OutString;
+            #       }
+            #       WriteString(OutString);
+            #       if (StoreString != null) AddStringToTable(StoreString);
+            #       OldCode = Code;
+            if code < tabsize:  # if (IsInTable(Code))
+                codevalue = table[code]
+                # (remember that CLEAR_CODE and END_OF_INFO_CODE are both
+                #  also in table and will return None; this will catch that
+                #  too.)
+                # FirstChar() comes from the prebuilt single-byte strings in
+                # CODEDICT (`firstchar`), cheaper than slicing a new one off
+                # codevalue.
+                if codevalue is None or lastvalue is None:
+                    storevalue = None  # first code after ClearCode, or special
+                else:
+                    storevalue = lastvalue + firstchar[codevalue[0]]
+            elif code == tabsize and lastvalue is not None:  # KwKwK
+                # pylint: disable=unsubscriptable-object  # not None here
+                codevalue = storevalue = lastvalue + firstchar[lastvalue[0]]
+            else:  # code wasn't in table, and can't be the next one either
                 logging.error('This may be PackBits data, not LZW')
                 raise ValueError('Invalid LZW data at code 0x%02x' % code)
-        if codevalue is not None:
-            doctest_debug('writing out %d bytes', len(codevalue))
-            outstream.write(codevalue)  # WriteString(OutString);
-            if storevalue is not None:  # if (StoreString != null)
-                insert(storevalue)  # AddStringToTable(StoreString);
-            lastvalue = codevalue  # OldCode = Code
-        elif code == END_OF_INFO_CODE:
-            if EOI_IS_EOD:
-                doctest_debug('EndOfInformation code found, exiting')
-                end_of_data = True
-            # else decode() will run until `for` loop is done
-            else:
-                doctest_debug('EndOfInformation code, only resetting bitlength')
+            if codevalue is not None:
+                outbuffer += codevalue  # WriteString(OutString);
+                if len(outbuffer) >= BUFFER_SIZE:
+                    write(outbuffer)
+                    outbuffer.clear()
+                if storevalue is not None:  # if (StoreString != null)
+                    insert(storevalue)  # AddStringToTable(StoreString);
+                lastvalue = codevalue  # OldCode = Code
+            elif code == END_OF_INFO_CODE:
+                if EOI_IS_EOD:
+                    doctest_debug('EndOfInformation code found, exiting')
+                    end_of_data = True
+                # else decode() will run until `for` loop is done
+                else:
+                    doctest_debug(
+                        'EndOfInformation code, only resetting bitlength')
+                    bitlength = minbits
+                    growat = (1 << bitlength) - 2
+            else:  # CLEAR_CODE
+                doctest_debug('processing ClearCode')
+                tabsize = firstfree
                 bitlength = minbits
-        else:  # CLEAR_CODE
-            doctest_debug('processing ClearCode')
-            codedict.clear()
-            codedict.update(newdict(specialcodes))
-            bitlength = minbits
-            lastvalue = None
-        try:
-            doctest_debug('decode(): bytes read: %d, written: %d',
-                          instream.tell(), outstream.tell())
-        except OSError:  # ignore Illegal Seek during doctests with BytesIO
-            pass
+                growat = (1 << bitlength) - 2
+                lastvalue = None
+    finally:
+        write(outbuffer)
+    try:
+        doctest_debug('decode(): bytes read: %d, written: %d',
+                      instream.tell(), outstream.tell())
+    except OSError:  # ignore Illegal Seek during doctests with BytesIO
+        pass
 
 def encode(instream=None, outstream=None, # pylint: disable=too-many-arguments
-           minbits=9, maxbits=12, stripsize=8192):
+           minbits=9, maxbits=12, stripsize=8192, workers=None):
     r'''
     Encode data using Lempel-Ziv-Welch compression
 
@@ -302,6 +363,10 @@ def encode(instream=None, outstream=None, # pylint: disable=too-many-arguments
     entirely in memory, even on small machines, but are large enough to
     maintain nearly optimal compression ratios.
 
+    In strip mode (EOI_IS_EOD empty), `workers` greater than 1 (default
+    ENCODE_WORKERS) has that many processes encoding strips at once; with
+    EOI_IS_EOD set, each strip depends on the one before, so it's ignored.
+
         >>> from io import BytesIO
         >>> instream = BytesIO(b'\x07\x07\x07\x08\x08\x07\x07\x06\x06')
         >>> outstream = BytesIO()
@@ -313,8 +378,23 @@ def encode(instream=None, outstream=None, # pylint: disable=too-many-arguments
         >>> decode(instream, outstream)
         >>> outstream.getvalue()
         b'\x07\x07\x07\x08\x08\x07\x07\x06\x06'
+
+    With EOI_IS_EOD empty, the table can still fill up partway through a
+    strip, and the ClearCode sent then has to go out at maxbits:
+
+        >>> import lzw, random
+        >>> saved, lzw.EOI_IS_EOD = lzw.EOI_IS_EOD, ''
+        >>> data = random.Random(0).randbytes(8192)
+        >>> packed, unpacked = BytesIO(), BytesIO()
+        >>> try:
+        ...     encode(BytesIO(data), packed)
+        ...     decode(BytesIO(packed.getvalue()), unpacked)
+        ... finally:
+        ...     lzw.EOI_IS_EOD = saved
+        >>> unpacked.getvalue() == data
+        True
     '''
-    # pylint: disable=too-many-statements
+    # pylint: disable=too-many-statements, too-many-locals
     def packstrip(strip=b''):
         r'''
         Encode data using Lempel-Ziv-Welch compression
@@ -339,48 +419,49 @@ def encode(instream=None, outstream=None, # pylint: disable=too-many-arguments
             } /* end of for loop */
             WriteCode (CodeFromString(Omega));
             WriteCode (EndOfInformation);
-        '''
-        def initialize_string_table():
-            '''
-            opposite of the one used for decode: strings map to code numbers
-            '''
-            return dict(map(reversed, newdict(False).items()))
 
+        Rather than the string Omega itself, we keep its code in `prefix`.
+        Since every string in the table is some shorter string in the table
+        plus one more character, Omega+K can be looked up by the pair
+        (CodeFromString(Omega), K), packed into one integer as
+        `(prefix << 8) | byte`. That keeps each lookup O(1) no matter how
+        long Omega grows, where hashing Omega+K itself is O(len(Omega)).
+        Single-character strings are their own codes, and never need to be
+        stored in the table at all.
+        '''
         def clear_string_table(filemode=EOI_IS_EOD):
             '''
             send clear code and reinitialize
 
             set filemode=False if calling right after EndOfInfoCode
             '''
-            nonlocal bitlength
+            nonlocal bitlength, growat
             if filemode:  # send CLEAR_CODE at current bitlength
                 write_code(CLEAR_CODE)
             code_from_string.clear()
-            code_from_string.update(initialize_string_table())
             bitlength = minbits
+            growat = (1 << bitlength) - 2
             if not filemode:  # send CLEAR_CODE as 9-bit code
                 write_code(CLEAR_CODE)
 
         def write_code(number):
             '''
-            pack number into bits with current bitlength and ship out bytes
+            pack number into bits with current bitlength and queue up bytes
 
-            high-order bits go first
+            high-order bits go first. completed bytes are appended to
+            `outbuffer`, which the caller ships out after each strip.
             '''
-            nonlocal bitstream, bitlength, writecount
-            doctest_debug('write_code %s: bitstream="%s", bitlength=%s',
-                          number, bitstream, bitlength)
+            nonlocal bitstream, bits, bitlength, growat, writecount
             if number is not None:
-                bitstream += '{0:0{1}b}'.format(number, bitlength)
+                bitstream = (bitstream << bitlength) | number
+                bits += bitlength
             else:
-                doctest_debug('write_code(None) with bitstream=%s, prefix=%s',
-                              bitstream, prefix)
-            while len(bitstream) >= 8:
-                byte = bytes([int(bitstream[0:8], 2)])
-                doctest_debug('writing leftmost 8 bits of %s (0x%02x)',
-                              bitstream, ord(byte))
-                outstream.write(byte)
-                bitstream = bitstream[8:]
+                doctest_debug('write_code(None) with bits=%d, prefix=%s',
+                              bits, prefix)
+            while bits >= 8:
+                bits -= 8
+                outbuffer.append(bitstream >> bits)
+                bitstream &= (1 << bits) - 1
             if number == CLEAR_CODE:
                 if writecount > CODE_SIZE:  # original dict size
                     doctest_debug('%d codes written since last ClearCode',
@@ -388,25 +469,26 @@ def encode(instream=None, outstream=None, # pylint: disable=too-many-arguments
                 writecount = CODE_SIZE
             else:
                 writecount += 1
-            if number == END_OF_INFO_CODE and bitstream:
+            if number == END_OF_INFO_CODE and bits:
                 # at end of strip, pack up any straggler bits and ship
-                bitstream = bitstream.ljust(8, '0')
-                doctest_debug('writing final bits of stream %s', bitstream)
-                outstream.write(bytes([int(bitstream, 2)]))
-                bitstream = ''
-            #doctest_debug('writecount: %d', writecount)
-            elif (writecount + 2) == (2 ** bitlength):
+                doctest_debug('writing final %d bits of stream', bits)
+                outbuffer.append(bitstream << (8 - bits))
+                bitstream = bits = 0
+            elif writecount == growat:
                 if bitlength < maxbits:
                     doctest_debug('increasing bitlength to %d at code %d',
                                   bitlength + 1, writecount)
                     bitlength += 1
+                    growat = (1 << bitlength) - 2
                 else:
                     doctest_debug('clearing table at code %d', writecount)
-                    clear_string_table()
+                    # the decoder is still reading maxbits codes here, even
+                    # in strip mode, so ClearCode goes out at this width.
+                    clear_string_table(filemode=True)
 
         def add_table_entry(entry):
             '''
-            add a new bytes-to-integer-code mapping
+            add a new (prefix code, byte)-to-integer-code mapping
 
             just before doubling table size, increment bitlength;
             i.e. after entering table entry 511, raise it from 9 to 10;
@@ -417,7 +499,7 @@ def encode(instream=None, outstream=None, # pylint: disable=too-many-arguments
 
             NOTE that in the above paragraph, "table" size includes the
             two special codes, which are *not* actually present in the
-            code_from_string dict.
+            code_from_string dict; nor are the 256 single-byte strings.
 
             NOTE also that entry 511 could mean the 512th entry with code
             511, or the 511th entry with code 510. Need to find out what
@@ -442,30 +524,24 @@ def encode(instream=None, outstream=None, # pylint: disable=too-many-arguments
             Accordingly, we move the bitlength-incrementing code to
             the `write_code` subroutine.
             '''
-            doctest_debug('add_table_entry(...%r) (length %d)',
-                          entry[-16:], len(entry))
-            if not entry:
-                return
-            # table is built without entries for ClearCode and
-            # EndOfInformation, so it starts at 256 elements exactly.
+            # table is built without entries for single bytes, ClearCode,
+            # and EndOfInformation, so it starts out empty.
             # the first new entry's code then has to be 258,
-            # which is len(table)+2.
-            newcode = len(code_from_string) + 2
+            # which is len(table)+256+2.
+            newcode = len(code_from_string) + CODE_SIZE + 2
             code_from_string[entry] = newcode
-            doctest_debug('added 0x%x (%d), key %d bytes ...%s to dict',
-                          newcode, newcode, len(entry), entry[-16:])
 
         nonlocal prefix, code_from_string
-        doctest_debug('beginning packstrip(...%s), length %d, prefix length %d',
-                      strip[-16:], len(strip), len(prefix))
+        doctest_debug('beginning packstrip(...%s), length %d, prefix %s',
+                      strip[-16:], len(strip), prefix)
         if strip == b'':
             if EOI_IS_EOD:  # if not, EOI was written at end of previous strip
-                write_code(code_from_string.get(prefix, None))
+                write_code(prefix)
                 doctest_debug('writing END_OF_INFO code at end of file')
                 write_code(END_OF_INFO_CODE)
             doctest_debug('ending packstrip on empty strip')
             return
-        if not code_from_string or not EOI_IS_EOD:
+        if prefix is None or not EOI_IS_EOD:
             # (TIFF6 spec says each strip should reinit table and
             # send ClearCode, but many PDF images don't show this
             # in use. So we only do it on first call, and after
@@ -477,16 +553,22 @@ def encode(instream=None, outstream=None, # pylint: disable=too-many-arguments
             # NOTE: the caller (encode) sets this. Prefix must be
             # carried over from one strip to the next.
             # So, leave this commented out.
-            #prefix = b''
+            #prefix = None
+        if prefix is None:
+            # Omega is the empty string, so Omega+K is just K.
+            prefix, strip = strip[0], strip[1:]
+        # the table is only ever cleared in place, never replaced, so its
+        # lookup method can be bound once for the whole strip.
+        lookup = code_from_string.get
         # for each character in the strip {
         #     K = GetNextCharacter();
-        # https://stackoverflow.com/a/57543519/493161
-        for byte in struct.unpack('{:d}c'.format(len(strip)), strip):
-            #doctest_debug('processing byte: %s', byte)
+        # (iterating over bytes gives us K as an integer)
+        for byte in strip:
         #     if Omega+K is in the string table {
         #         Omega = Omega+K; /* string concatenation */
-            if prefix + byte in code_from_string:
-                prefix += byte
+            entry = (prefix << 8) | byte
+            if (code := lookup(entry)) is not None:
+                prefix = code
         #     } else {
         #         WriteCode (CodeFromString(Omega));
         #         AddTableEntry(Omega+K);
@@ -495,20 +577,18 @@ def encode(instream=None, outstream=None, # pylint: disable=too-many-arguments
                 # NOTE we need to reverse the order of the pseudocode above,
                 # since write_code now adjusts bitlength instead of
                 # add_table_entry. see notes under add_table_entry().
-                add_table_entry(prefix + byte)
-                write_code(code_from_string.get(prefix, None))
+                add_table_entry(entry)
+                write_code(prefix)
                 prefix = byte
         # WriteCode (CodeFromString(Omega));
         # WriteCode (EndOfInformation);
-        doctest_debug('finishing strip, prefix=...%s, length %d',
-                      prefix[-16:], len(prefix))
+        doctest_debug('finishing strip, prefix=%s', prefix)
         if not EOI_IS_EOD:
             doctest_debug('writing final prefix before EOI code')
-            write_code(code_from_string.get(prefix, None))
-            prefix = b''  # reset prefix
+            write_code(prefix)
+            prefix = None  # reset prefix, forcing reset on next packstrip()
             doctest_debug('writing END_OF_INFO code at end of strip')
             write_code(END_OF_INFO_CODE)
-            code_from_string.clear()  # to force reset on next packstrip()
         doctest_debug('ending packstrip(...%s), length %d',
                       strip[-16:], len(strip))
         return
@@ -517,12 +597,29 @@ def encode(instream=None, outstream=None, # pylint: disable=too-many-arguments
     writecount = CODE_SIZE
     instream = instream or sys.stdin.buffer
     outstream = outstream or sys.stdout.buffer
+    if workers is None:
+        try:
+            workers = int(ENCODE_WORKERS or 1)
+        except ValueError:
+            logging.warning('ENCODE_WORKERS=%r is not a number, using 1',
+                            ENCODE_WORKERS)
+            workers = 1
+    if workers > 1 and not EOI_IS_EOD:
+        _encode_parallel(instream, outstream, minbits, maxbits, stripsize,
+                         workers)
+        logging.debug('ending lzw.encode()')
+        return
     minbits = bitlength = (minbits or MINBITS)
     maxbits = maxbits or MAXBITS
-    bitstream, prefix = '', b''
+    growat = (1 << bitlength) - 2  # writecount at which bitlength goes up
+    bitstream = bits = 0
+    prefix = None
+    outbuffer = bytearray()
     code_from_string = {}
     while (strip := instream.read(stripsize)) != b'':
         packstrip(strip)
+        outstream.write(outbuffer)
+        outbuffer.clear()
         try:
             doctest_debug('encode(): bytes read: %d, written: %d',
                           instream.tell(), outstream.tell())
@@ -530,8 +627,72 @@ def encode(instream=None, outstream=None, # pylint: disable=too-many-arguments
             pass
     if EOI_IS_EOD:
         packstrip(b'')
+        outstream.write(outbuffer)
     logging.debug('ending lzw.encode()')
 
+def encode_strip(strip, minbits=9, maxbits=12):
+    r'''
+    encode a single strip by itself, returning the compressed bytes
+
+    when EOI_IS_EOD is empty, every strip begins with ClearCode and ends with
+    EndOfInformation on a byte boundary, so nothing carries over from one
+    strip to the next; that's what lets encode() farm strips out to other
+    processes, this being the part that runs in each of them.
+
+        >>> encode_strip(b'\x07\x07\x07\x08\x08\x07\x07\x06\x06')
+        b'\x80\x01\xe0@\x80D\x08\x0c\x06\x80\x80'
+    '''
+    outstream = io.BytesIO()
+    encode(io.BytesIO(strip), outstream, minbits, maxbits, len(strip), 1)
+    return outstream.getvalue()
+
+def _encode_parallel(instream, outstream, # pylint: disable=too-many-arguments
+                     minbits, maxbits, stripsize, workers):
+    r'''
+    encode strips in `workers` processes at once, for encode() in strip mode
+
+    strips are handed out a batch at a time, so memory use stays bounded,
+    and the packed strips are written back in their original order. the
+    output is identical to encoding them one after another:
+
+        >>> import lzw, random
+        >>> from io import BytesIO
+        >>> data = random.Random(0).randbytes(30000)
+        >>> serial, parallel = BytesIO(), BytesIO()
+        >>> saved, lzw.EOI_IS_EOD = lzw.EOI_IS_EOD, ''
+        >>> try:
+        ...     encode(BytesIO(data), serial, workers=1)
+        ...     encode(BytesIO(data), parallel, workers=2)
+        ... finally:
+        ...     lzw.EOI_IS_EOD = saved
+        >>> parallel.getvalue() == serial.getvalue()
+        True
+    '''
+    # pylint: disable=import-outside-toplevel  # only needed here
+    from concurrent.futures import ProcessPoolExecutor
+    strips = iter(lambda: instream.read(stripsize), b'')
+    # the workers may not have been forked from this process, so make sure
+    # they're in strip mode rather than trusting their environment for it
+    with ProcessPoolExecutor(workers, initializer=_set_eoi_is_eod,
+                             initargs=('',)) as pool:
+        while batch := list(islice(strips, workers * 4)):
+            for packed in pool.map(encode_strip, batch,
+                                   repeat(minbits), repeat(maxbits)):
+                outstream.write(packed)
+
+def _set_eoi_is_eod(value):
+    '''
+    set EOI_IS_EOD in a worker process started by _encode_parallel()
+    '''
+    global EOI_IS_EOD  # pylint: disable=global-statement
+    EOI_IS_EOD = value
+
+SELECTOR = {
+ 'encode': encode,
+ 'decode': decode,
+ 'print': print,
+}
+
 def dispatch(allowed, args, minargs, binary=True):
     '''
     simple dispatcher for scripts whose first arg is an action
@@ -559,7 +720,7 @@ def dispatch(allowed, args, minargs, binary=True):
         args[3] = open(args[3], 'w' + binary)
     else:
         args[3] = None
-    eval(args[1])(*args[2:argcount])  # pylint: disable=eval-used
+    SELECTOR[args[1]](*args[2:argcount])
 
 if os.path.splitext(os.path.basename(sys.argv[0]))[0] == 'doctest' or \
                     os.getenv('PYTHON_DEBUGGING'):
@@ -4,7 +4,7 @@ Lempel-Ziv-Welch compression and decompression
 
 A different approach, hopefully cleaner and faster than lzw.py
 '''
-import sys, os, struct, io, logging  # pylint: disable=multiple-imports
+import sys, os, io, logging  # pylint: disable=multiple-imports
 
 logging.basicConfig(level=logging.DEBUG if __debug__ else logging.WARNING)
 
@@ -15,11 +15,12 @@ MINBITS = 9
 MAXBITS = 12
 # encoding and decoding tables, make shallow copies of these for use
 STRINGTABLE = {n: bytes([n]) for n in range(256)}  # codes to strings
-CODETABLE = dict(map(reversed, STRINGTABLE.items()))  # strings to codes
+CODETABLE = {s: n for n, s in STRINGTABLE.items()}  # strings to codes
 CODEMAP = {n: n for n in range(256)}  # codes to codes
 CLEAR_CODE = 256  # see TIFF6.pdf pp. 58-63 for use of special codes
 END_OF_INFO_CODE = 257
 SPECIAL = {CLEAR_CODE: None, END_OF_INFO_CODE: None}
+SPECIAL_STRINGTABLE = {**STRINGTABLE, **SPECIAL}
 
 def doctest_debug(*args):  # pylint: disable=unused-argument
     '''
@@ -45,7 +46,10 @@ class CodeReader(io.BufferedReader):
         super().__init__(stream, buffer_size)
         self.bitlength = self.minbits = minbits
         self.maxbits = maxbits
-        self.bitstream = bytearray()
+        self.bitstream = 0
+        self.bits = 0  # number of bits queued in (int) buffer
+        self.chunksize = buffer_size
+        self.rawbytes = iter(b'')  # integer bytes of the current chunk
 
     def __iter__(self):
         '''
@@ -56,20 +60,30 @@ class CodeReader(io.BufferedReader):
     def __next__(self):
         '''
         Return the next code from the stream
-        '''
-        while len(self.bitstream) < self.bitlength:
-            nextbyte = super().read(1)
-            doctest_debug('nextbyte: %s', nextbyte)
-            if not nextbyte:  # empty string or None: EndOfFile
-                if not self.bitstream:
+
+        bytes are shifted into the integer `bitstream` as needed, and
+        codes taken off its high end. input is read a chunk at a time,
+        rather than making a read call for every byte.
+        '''
+        bitstream, bits, bitlength = self.bitstream, self.bits, self.bitlength
+        while bits < bitlength:
+            nextbyte = next(self.rawbytes, None)
+            if nextbyte is not None:
+                bitstream = (bitstream << 8) | nextbyte
+                bits += 8
+            elif chunk := super().read(self.chunksize):
+                self.rawbytes = iter(chunk)
+            else:  # empty string or None: EndOfFile
+                if not bits:
                     raise StopIteration
-                self.bitstream.extend(  # pad remaining bits with zeroes
-                    b'0' * (self.bitlength - len(self.bitstream)))
-            else:
-                self.bitstream.extend(format(ord(nextbyte), '08b').encode())
-        result = int(bytes(self.bitstream[:self.bitlength]), 2)
-        self.bitstream[:self.bitlength] = []
-        return result
+                # pad remaining bits with zeroes
+                bitstream <<= bitlength - bits
+                bits = bitlength
+        # the bit buffer is worked on in locals above, and only stored
+        # back into the instance once per code
+        self.bits = bits = bits - bitlength
+        self.bitstream = bitstream & ((1 << bits) - 1)
+        return bitstream >> bits
 
     def read(self, count=None):
         '''
@@ -199,37 +213,41 @@ class LZWReader(io.BufferedReader):
             logging.warning('Using non-CodeReader iterator for test purposes')
             self.codesource = stream
         self.special = special  # False for rosettacode.org examples
-        self.codedict = {}
+        self.minbits = minbits
+        self.table = []  # strings, indexed by code
         self.oldcode = None
         self.buffer = bytearray()
         self.initialize_table()
-        self.limits = tuple((1 << n) - 2 for n in range(minbits, maxbits + 1))
 
     def __next__(self):
         '''
         returns next string from table, adjusting bitlength as we go
         '''
         code = next(self.codesource)
+        table = self.table  # rebound by initialize_table(), so look it up
         outstring = storestring = None
-        doctest_debug('next LZW code: %s', code)
         if code == END_OF_INFO_CODE and self.special:
-            if self.codesource.bitstream.strip(b'0'):
-                logging.error('bitstream remaining: %s',
-                              self.codesource.bitstream)
+            if self.codesource.bitstream:
+                logging.error('bitstream remaining: 0x%x (%d bits)',
+                              self.codesource.bitstream,
+                              self.codesource.bits)
                 raise ValueError('Nonzero bits left after EOI code')
-            self.codesource.bitstream[:] = []  # clear the buffer
+            # clear the buffer
+            self.codesource.bitstream = self.codesource.bits = 0
             raise StopIteration
         if code == CLEAR_CODE and self.special:
             self.initialize_table()
-        elif code in self.codedict:
-            outstring = self.codedict[code]
+        elif code < len(table):
+            outstring = table[code]
+            # FirstChar() is one of the prebuilt single-byte strings,
+            # rather than a new one sliced off each time
             try:
-                storestring = self.codedict[self.oldcode] + outstring[0:1]
-            except (KeyError, TypeError):  # oldcode or outstring is None
+                storestring = table[self.oldcode] + STRINGTABLE[outstring[0]]
+            except TypeError:  # oldcode or outstring is None
                 pass
         else:
-            outstring = self.codedict[self.oldcode]
-            outstring += outstring[0:1]
+            outstring = table[self.oldcode]
+            outstring += STRINGTABLE[outstring[0]]
             storestring = outstring
         if storestring is not None:
             self.add_string_to_table(storestring)
@@ -239,11 +257,13 @@ class LZWReader(io.BufferedReader):
     def initialize_table(self):
         '''
         (Re-)Initialize code table
+
+        the table is a plain list indexed by code, so lookups don't need
+        to hash anything; it starts as a copy of the prebuilt strings.
         '''
-        self.codedict.clear()
-        self.codedict.update(STRINGTABLE)
-        if self.special:
-            self.codedict.update(SPECIAL)
+        self.table = list((SPECIAL_STRINGTABLE if self.special
+                           else STRINGTABLE).values())
+        self.growat = (1 << self.minbits) - 2  # table size to bump bitlength
         try:
             self.codesource.bitlength = self.codesource.minbits
         except AttributeError:
@@ -254,15 +274,15 @@ class LZWReader(io.BufferedReader):
         Return `count` bytes, defaulting to all available
         '''
         count = count or sys.maxsize
-        while len(self.buffer) < count:
-            try:
-                chunk = next(self)
-                doctest_debug('next chunk: ...%s', chunk[-10:])
-                self.buffer.extend(chunk)
-            except StopIteration:
-                break
-        result = bytes(self.buffer[:count])
-        self.buffer[:count] = []
+        buffer = self.buffer
+        extend = buffer.extend
+        try:
+            while len(buffer) < count:
+                extend(next(self))
+        except StopIteration:
+            pass
+        result = bytes(buffer[:count])
+        del buffer[:count]
         return result
 
     def add_string_to_table(self, bytestring):
@@ -270,11 +290,11 @@ class LZWReader(io.BufferedReader):
         Add bytestring to code table
         '''
         if bytestring is not None:
-            newkey = len(self.codedict)
-            self.codedict[newkey] = bytestring
-            doctest_debug('set codedict[%d] = ...%s', newkey, bytestring[-10:])
+            newkey = len(self.table)
+            self.table.append(bytestring)
             # at 510, 1022, and 2046, bump bitlength
-            if newkey in self.limits:
+            if newkey == self.growat:
+                self.growat = (self.growat << 1) + 2
                 try:
                     if self.codesource.bitlength < self.codesource.maxbits:
                         doctest_debug(
@@ -328,8 +348,7 @@ class CodeWriter(io.BufferedWriter):
         super().__init__(stream, buffer_size)
         self.bitlength = self.minbits = minbits
         self.maxbits = maxbits
-        self.limits = tuple((1 << n) - 2 for n in range(minbits, maxbits + 1))
-        doctest_debug('CodeWriter.limits: %s', repr(self.limits))
+        self.growat = (1 << minbits) - 2  # codes_written to bump bitlength
         self.special = special
         self.bitstream = 0
         self.bits = 0  # number of bits queued in (int) buffer
@@ -342,24 +361,19 @@ class CodeWriter(io.BufferedWriter):
         '''
         convert variable-length numbers to bytes and write to underlying stream
 
-        NOTE: probably not a good idea to pass arrays with length > 1
-        except for testing purposes. `list.pop` is slow.
+        `array` may be any iterable of codes, and is left as it was.
         '''
         written = 0
-        while array:
-            number = array.pop(0)
-            doctest_debug('CodeWriter writing %d bit code #%d: 0b%s',
-                          self.bitlength, self.codes_written,
-                          bin(number)[2:].zfill(self.bitlength))
-            self.bitstream <<= self.bitlength
-            self.bitstream |= number
+        for number in array:
+            self.bitstream = (self.bitstream << self.bitlength) | number
             self.bits += self.bitlength
             self.codes_written += 1
-            if self.codes_written in self.limits:
+            if self.codes_written == self.growat:
                 if self.bitlength < self.maxbits:
                     doctest_debug('raising bitlength to %d at %d codes',
                                   self.bitlength + 1, self.codes_written)
                     self.bitlength += 1
+                    self.growat = (1 << self.bitlength) - 2
                 else:
                     raise CodeTableFull()
         if self.bits and self.bits % 8 == 0:
@@ -370,8 +384,6 @@ class CodeWriter(io.BufferedWriter):
                 logging.error('bitstream 0x%x does not fit into %d bits',
                               self.bitstream, self.bits)
                 raise
-            doctest_debug('CodeWriter writing %d bytes: ...%s', count,
-                          bytestring[-10:])
             written += super().write(bytestring)
             self.bitstream = self.bits = 0
         return written
@@ -452,26 +464,37 @@ class LZWWriter(io.BufferedWriter):
         self.codedict.clear()
         self.codedict.update(CODETABLE)
         self.codesink.bitlength = self.codesink.minbits
+        self.codesink.growat = (1 << self.codesink.minbits) - 2
         self.codesink.codes_written = len(self.codedict)
 
     def write(self, strip):
         '''
         Encode strip of image, and send codes downstream
+
+        iterating over the strip gives integers, which index the
+        single-byte strings already built in STRINGTABLE.
+
+        attributes used on every byte are bound to locals for the loop.
+        `codedict` can be, since initialize_table() refills the same dict
+        rather than replacing it.
         '''
-        for byte in struct.unpack('{:d}c'.format(len(strip)), strip):
-            chunk = self.prefix + byte
-            if chunk in self.codedict:
-                self.prefix = chunk
+        codedict, writecode = self.codedict, self.codesink.write
+        prefix = self.prefix
+        for byte in map(STRINGTABLE.__getitem__, strip):
+            chunk = prefix + byte
+            if chunk in codedict:
+                prefix = chunk
             else:
                 try:
-                    self.codesink.write([self.codedict[self.prefix]])
+                    writecode([codedict[prefix]])
                     self.add_string(chunk)
                 except CodeTableFull:
                     # note that the exception is thrown *after* the code
                     # is written, so we don't need to re-send it.
-                    self.codesink.write([CLEAR_CODE])
+                    writecode([CLEAR_CODE])
                     self.initialize_table()
-                self.prefix = byte
+                prefix = byte
+        self.prefix = prefix
 
     def flush(self):
         '''
@@ -495,7 +518,6 @@ class LZWWriter(io.BufferedWriter):
         '''
         newcode = len(self.codedict) + self.offset
         self.codedict[bytestring] = newcode
-        doctest_debug('added code %d to table', newcode)
 
 if os.path.splitext(os.path.basename(sys.argv[0]))[0] == 'doctest' or \
                     os.getenv('PYTHON_DEBUGGING'):
@@ -533,7 +555,7 @@ def dispatch(allowed, args, minargs, binary=True):
         args[3] = open(args[3], 'w' + binary)
     else:
         args[3] = None
-    eval(args[1])(*args[2:argcount])  # pylint: disable=eval-used
+    SELECTOR[args[1]](*args[2:argcount])
 
 def encode(source=None, sink=None):
     '''
@@ -580,6 +602,13 @@ def decode(source=None, sink=None):
     finally:
         sink.close()
 
+SELECTOR = {
+ 'encode': encode,
+ 'encode_strips': encode_strips,
+ 'decode': decode,
+ 'print': print,
+}
+
 if os.path.splitext(os.path.basename(sys.argv[0]))[0] == 'doctest' or \
                     os.getenv('PYTHON_DEBUGGING'):
     # pylint: disable=function-redefined
@@ -8,7 +8,7 @@ import sys, logging  # pylint: disable=multiple-imports
 
 logging.basicConfig(level=logging.DEBUG if __debug__ else logging.WARN)
 
-def unpack(instream=None, outstream=None):
+def unpack(instream=None, outstream=None, buffersize=4096):
     r'''
     UnPackBits routine from pseudocode
 
@@ -29,6 +29,11 @@ def unpack(instream=None, outstream=None):
     -1 negated = 1, plus 1 is 2; 257 - 255 = 2
 
     So we implement (-signed+1) as (257-unsigned)
+
+    Input is read `buffersize` bytes at a time rather than a byte at a
+    time; a run's count and its data may straddle reads, so whenever less
+    than a maximal run (129 bytes) is left unscanned, the next block is
+    appended first.
     '''
     instream = instream or sys.stdin.buffer
     outstream = outstream or sys.stdout.buffer
@@ -36,19 +41,28 @@ def unpack(instream=None, outstream=None):
     # (this information isn't available so we just read the whole thing)
     # "Read the next source byte into n."
     # pylint: disable=invalid-name  # using pseudocode naming, not snake_case
-    while (nextbyte := instream.read(1)) != b'':
-        n = ord(nextbyte)
-        logging.debug('nextbyte is %s (%d)', nextbyte, n)
+    read, write = instream.read, outstream.write
+    data, index = b'', 0
+    while True:
+        if len(data) - index < 129:
+            data, index = data[index:], 0
+            while len(data) < 129 and (block := read(buffersize)):
+                data += block
+            if not data:
+                break
+        n = data[index]
         # If n between 0 and 127 inclusive, copy the next n+1 bytes literally
         if n < 128:
-            logging.debug('copying verbatim next %d bytes', n + 1)
-            outstream.write(instream.read(n + 1))
+            write(data[index + 1:index + n + 2])
+            index += n + 2
         # Else if n is between -127 [128] and -1 [255] inclusive,
         # copy the next byte -n+1 [257-n] times.
         # Else if n is -128, noop [we ignore this case].
         elif n != 128:
-            logging.debug('writing out following byte %d times', 257 - n)
-            outstream.write(instream.read(1) * (257 - n))
+            write(data[index + 1:index + 2] * (257 - n))
+            index += 2
+        else:
+            index += 1
 
 def pack(instream=None, outstream=None, buffersize=4096):
     r'''
@@ -143,11 +157,16 @@ def pack(instream=None, outstream=None, buffersize=4096):
             bytestring = substring
     purge(chunks, True)
 
+SELECTOR = {
+ 'pack': pack,
+ 'unpack': unpack,
+}
+
 if __name__ == '__main__':
     # pylint: disable=consider-using-with
     sys.argv += [None]  # in case action not specified
     sys.argv += [None, None]  # use stdin and stdout by default
-    if sys.argv[1] not in ('pack', 'unpack'):
+    if sys.argv[1] not in SELECTOR:
         logging.warning('usage: %s unpack test.rle -', sys.argv[0])
         raise ValueError('Must specify either "pack" or "unpack"')
     if sys.argv[2] and sys.argv[2] != '-':
@@ -158,4 +177,4 @@ if __name__ == '__main__':
         sys.argv[3] = open(sys.argv[3], 'wb')
     else:
         sys.argv[3] = None
-    eval(sys.argv[1])(*sys.argv[2:4])  # pylint: disable=eval-used
+    SELECTOR[sys.argv[1]](*sys.argv[2:4])